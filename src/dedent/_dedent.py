@@ -1,19 +1,8 @@
-import re
 import sys
-from collections.abc import Callable, Iterable
-from dataclasses import dataclass, field
+from collections.abc import Callable
 from enum import Enum
-from functools import reduce
-from itertools import filterfalse, tee
-from typing import TYPE_CHECKING, Final, Literal, cast, final
-from uuid import uuid4
-
-
-class Missing:
-    """Placeholder for missing values."""
-
-
-MISSING: Final = Missing()
+from functools import lru_cache
+from typing import Final, Literal, cast, final
 
 DEFAULT_STRIP: Final = "smart"
 DEFAULT_ALIGN: Final = False
@@ -26,147 +15,269 @@ class AlignSpec(str, Enum):
     NOALIGN = "noalign"
 
 
-Strip = Literal["smart", "all", "none"]
+_ALIGN_SPECS: Final = frozenset(AlignSpec)
 
-_INDENTED: Final = re.compile(r"^(\s+)")
-_INDENTED_WITH_CONTENT: Final = re.compile(r"^(\s+)\S+")
-_SMART_STRIP: Final = re.compile(r"^[^\S\n]*\n?")
+Strip = Literal["smart", "all", "none"]
 
 _ALIGN_MARKER_PREFIX: Final = "DEDENT_ALIGN"
 _SEP: Final = "\x00"
 
-_ALIGN_MARKER: Final = re.compile(
-    rf"{_SEP}{_ALIGN_MARKER_PREFIX}:([a-f0-9]{{32}}){_SEP}(.*?){_SEP}{_ALIGN_MARKER_PREFIX}:\1{_SEP}",
-    re.DOTALL,
-)
+_ALIGN_MARKER_START: Final = f"{_SEP}{_ALIGN_MARKER_PREFIX}:"
+_ALIGN_MARKER_END: Final = f"{_SEP}{_ALIGN_MARKER_PREFIX}{_SEP}"
+_HEX_DIGITS: Final = "0123456789abcdef"
+
+# Longer strings are rarely repeated, and caching them would keep large inputs and outputs alive
+_CACHE_MAX_LENGTH: Final = 1024
 
 
-def _safe_match_first_group(pattern: re.Pattern[str], string: str) -> str | None:
+def _advance_indent(text: str, *, indent: str, in_indent: bool) -> tuple[str, bool]:
     """
-    Safely extract the first capture group from a regex match.
+    Advance the indentation of the current line past a chunk of text.
+
+    Once the current line has content its indentation can't change, so the rest of the line is
+    never copied and rendering stays linear however long the line grows.
 
     Args:
-        pattern: The compiled regex pattern to match against.
-        string: The string to match.
+        text: The text being appended.
+        indent: The indentation of the current line, before `text` is appended.
+        in_indent: Whether the current line is still all whitespace, before `text` is appended.
 
     Returns:
-        The first capture group if the pattern matches, None otherwise.
+        A tuple of (indent, in_indent) for the current line, after `text` is appended.
     """
-    if m := pattern.match(string):
-        return m.group(1)
-    return None
+    newline = text.rfind("\n")
+    if newline != -1:
+        indent = ""
+        text = text[newline + 1 :]
+    elif not in_indent:
+        return indent, False
+
+    if content := text.lstrip():
+        return indent + text[: len(text) - len(content)], False
 
+    return indent + text, True
 
-def _align_value(value: str, preceding_text: str) -> str:
+
+def _align_value(value: str, indent: str) -> str:
     """
     Align multiline value to match the indentation of the current line.
 
     If the value contains newlines, each line after the first is indented to match the indentation
-    of the current line in the preceding text.
+    of the current line.
 
     Args:
         value: The string value to align, potentially containing newlines.
-        preceding_text: The text that precedes this value, used to determine the current line's
-            indentation.
+        indent: The leading whitespace of the line the value is placed on.
 
     Returns:
         The value with subsequent lines indented to match the current line's indentation, or the
         original value if no indentation is found or if the value doesn't contain newlines.
     """
-    current_line = preceding_text[preceding_text.rfind("\n") + 1 :]
-    if indent := _safe_match_first_group(_INDENTED, current_line):
+    if indent and "\n" in value:
         return value.replace("\n", "\n" + indent)
 
     return value
 
 
-def _strip_string(string: str, strip: Strip) -> str:
+def _smart_strip_lines(lines: list[str]) -> None:
     """
-    Strip leading and trailing whitespace from a string.
+    Strip one leading and one trailing blank line, in place.
+
+    If the first line isn't blank, its leading whitespace is stripped instead, and likewise the
+    trailing whitespace of the last line.
 
     Args:
-        string: The string to strip.
-        strip: The strip mode to use.
+        lines: The lines to strip, which must not be empty.
+    """
+    if not lines[0] or lines[0].isspace():
+        del lines[0]
+    else:
+        lines[0] = lines[0].lstrip()
 
-    Returns:
-        The stripped string.
+    if not lines:
+        return
+
+    if not lines[-1] or lines[-1].isspace():
+        del lines[-1]
+    else:
+        lines[-1] = lines[-1].rstrip()
+
+
+def _strip_lines(lines: list[str]) -> None:
     """
-    match strip:
-        case "smart":
-            string = _SMART_STRIP.sub("", string, count=1)
-            # Reversing to get the rightmost match instead of leftmost
-            return _SMART_STRIP.sub("", string[::-1], count=1)[::-1]
-        case "all":
-            return string.strip()
-        case "none":
-            return string
-
-
-def _dedent_string(string: str) -> str:
+    Strip all leading and trailing whitespace, including blank lines, in place.
+
+    Args:
+        lines: The lines to strip.
+    """
+    while lines and (not lines[-1] or lines[-1].isspace()):
+        del lines[-1]
+
+    if not lines:
+        return
+
+    # The last line isn't blank, so this stops before running off the end
+    first = 0
+    while not lines[first] or lines[first].isspace():
+        first += 1
+
+    del lines[:first]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+
+
+def _keep_lines(_lines: list[str]) -> None:
+    """
+    Leave lines unstripped, for the "none" strip mode.
+
+    Args:
+        _lines: The lines, which are left as-is.
+    """
+
+
+_LINE_STRIPPERS: Final[dict[Strip, Callable[[list[str]], None]]] = {
+    "smart": _smart_strip_lines,
+    "all": _strip_lines,
+    "none": _keep_lines,
+}
+_STRIP_MODES: Final = ", ".join(map(repr, _LINE_STRIPPERS))
+
+
+def _dedent_and_strip(string: str, strip: Strip) -> str:
     """
-    Remove common leading whitespace from a string.
+    Remove common leading whitespace from a string and strip it, in a single pass over its lines.
 
     Args:
         string: The string to dedent.
+        strip: The strip mode to use.
 
     Returns:
-        The dedented string.
+        The dedented and stripped string.
     """
+    strip_lines = _LINE_STRIPPERS[strip]
+
+    if "\n" not in string:
+        # A single line's indent is all of its leading whitespace, unless it's blank
+        lines = [string.lstrip() or string]
+        strip_lines(lines)
+        return "\n".join(lines)
+
     lines = string.split("\n")
     max_indent = len(string)
-    min_indent: int = reduce(
-        lambda acc, line: (
-            min(acc, len(indent))
-            if (indent := _safe_match_first_group(_INDENTED_WITH_CONTENT, line))
-            else acc
-        ),
-        lines,
-        max_indent,
-    )
+    min_indent = max_indent
+
+    for line in lines:
+        # Whitespace-only lines have no content and so don't count towards the indent
+        if (content := line.lstrip()) and 0 < (indent := len(line) - len(content)) < min_indent:
+            min_indent = indent
+
+    # Stripping only removes blank lines and whitespace at the ends, which doesn't change the
+    # indent, so it can be applied before the lines are dedented
+    strip_lines(lines)
 
     if min_indent == max_indent:
-        return string
+        return "\n".join(lines)
 
+    # A line starting with whitespace is either blank or indented by at least min_indent, so only
+    # the first character needs checking
     return "\n".join(
-        line[min_indent:] if len(line) >= min_indent and line[:min_indent].isspace() else line
+        line[min_indent:] if len(line) >= min_indent and line[0].isspace() else line
         for line in lines
     )
 
 
+@lru_cache(maxsize=1024)
+def _dedent_cached(string: str, strip: Strip) -> str:
+    """
+    Dedent and strip a string without alignment markers, memoizing the result.
+
+    Literal strings passed to `dedent()` repeat across calls, so this skips the work entirely for
+    strings that have been seen before.
+
+    Args:
+        string: The string to dedent, which must not contain alignment markers and should be no
+            longer than `_CACHE_MAX_LENGTH`.
+        strip: The strip mode to use.
+
+    Returns:
+        The dedented and stripped string.
+    """
+    return _dedent_and_strip(string, strip)
+
+
+def _dedent_string(string: str, strip: Strip) -> str:
+    """
+    Resolve alignment markers in a string, then dedent and strip it.
+
+    Args:
+        string: The string to dedent, which may contain alignment markers.
+        strip: The strip mode to use.
+
+    Returns:
+        The dedented and stripped string.
+    """
+    formatted_string = process_align_markers(string)
+    if formatted_string is string and len(string) <= _CACHE_MAX_LENGTH:
+        # No alignment markers, so the result depends only on the input
+        return _dedent_cached(string, strip)
+
+    return _dedent_and_strip(formatted_string, strip)
+
+
+def _mark_aligned(text: str) -> str:
+    """
+    Frame text with alignment markers, recording its length in the opening marker.
+
+    The frame is `<SEP>DEDENT_ALIGN:<hex length><SEP><text><SEP>DEDENT_ALIGN<SEP>`, so the end
+    of the value can usually be found by arithmetic. The closing marker confirms it, and is
+    searched for instead if the string was edited after the value was marked.
+
+    Args:
+        text: The text to mark for alignment.
+
+    Returns:
+        The marked text.
+    """
+    return f"{_ALIGN_MARKER_START}{len(text):x}{_SEP}{text}{_ALIGN_MARKER_END}"
+
+
 @final
-@dataclass(frozen=True, kw_only=True)
 class Aligned:
     """
-    Wrapper that embeds alignment markers around a value for f-string compatibility.
+    Wrapper that frames a value with alignment markers for f-string compatibility.
 
-    When used inside an f-string and passed to `dedent()`, the markers signal that the
+    When used inside an f-string and passed to `dedent()`, the marker signals that the
     interpolated value should be indented to match its surrounding context.
 
     This class implements `__str__`, `__repr__`, and `__format__` so that conversion
     flags (`!s`, `!r`) and format specifications work correctly.
     """
 
-    _value: object
-    _ID: Final[str] = field(default_factory=lambda: uuid4().hex, init=False)
+    __slots__ = ("_value",)
 
-    def _wrap(self, text: str) -> str:
-        marker = f"{_SEP}{_ALIGN_MARKER_PREFIX}:{self._ID}{_SEP}"
-        return f"{marker}{text}{marker}"
+    def __init__(self, value: object, /) -> None:
+        """
+        Wrap a value for alignment.
+
+        Args:
+            value: The value to wrap.
+        """
+        self._value: Final = value
 
     # NOTE: PEP 698: Override Decorator (3.12)
     # @overload
     def __str__(self) -> str:  # pyright: ignore[reportImplicitOverride]
-        return self._wrap(str(self._value))
+        return _mark_aligned(str(self._value))
 
     # NOTE: PEP 698: Override Decorator (3.12)
     # @overload
     def __repr__(self) -> str:  # pyright: ignore[reportImplicitOverride]
-        return self._wrap(repr(self._value))
+        return _mark_aligned(repr(self._value))
 
     # NOTE: PEP 698: Override Decorator (3.12)
     # @overload
     def __format__(self, format_spec: str) -> str:  # pyright: ignore[reportImplicitOverride]
-        return self._wrap(format(self._value, format_spec))
+        return _mark_aligned(format(self._value, format_spec))
 
 
 def align(value: object) -> Aligned:
@@ -204,7 +315,75 @@ def align(value: object) -> Aligned:
         An `Aligned` wrapper whose string representation contains invisible
         markers that `dedent()` uses to apply alignment.
     """
-    return Aligned(_value=value)
+    return Aligned(value)
+
+
+def _find_closing_marker(string: str, start: int, end: int) -> int:
+    """
+    Find the closing alignment marker for a value, skipping over nested marked values.
+
+    Args:
+        string: The string containing the marked value.
+        start: The index at which the value begins.
+        end: The index of the first closing marker after `start`.
+
+    Returns:
+        The index of the matching closing marker, or -1 if there is none.
+    """
+    depth = 0
+
+    while end != -1:
+        nested = string.find(_ALIGN_MARKER_START, start, end)
+        if nested != -1:
+            depth += 1
+            start = nested + len(_ALIGN_MARKER_START)
+        elif depth:
+            depth -= 1
+            start = end + len(_ALIGN_MARKER_END)
+            end = string.find(_ALIGN_MARKER_END, start)
+        else:
+            return end
+
+    return -1
+
+
+def _find_aligned_value(string: str, start: int) -> tuple[int, int] | None:
+    """
+    Locate the value following the alignment marker that begins at `start`.
+
+    Args:
+        string: The string containing the marker.
+        start: The index at which the marker begins.
+
+    Returns:
+        A tuple of (value_start, value_end) bounding the marked value, or None if the marker is
+        malformed or has no matching closing marker. If no closing marker follows the value at
+        all, value_end is -1.
+    """
+    length_start = start + len(_ALIGN_MARKER_START)
+    length_end = string.find(_SEP, length_start)
+    if length_end == -1:
+        return None
+
+    length = string[length_start:length_end]
+    if not length or length.strip(_HEX_DIGITS):
+        return None
+
+    value_start = length_end + 1
+    value_end = value_start + int(length, 16)
+    if string.startswith(_ALIGN_MARKER_END, value_end):
+        return value_start, value_end
+
+    # The string was edited after the value was marked, so its recorded length can't be trusted
+    first_end = string.find(_ALIGN_MARKER_END, value_start)
+    if first_end == -1:
+        return value_start, -1
+
+    value_end = _find_closing_marker(string, value_start, first_end)
+    if value_end == -1:
+        return None
+
+    return value_start, value_end
 
 
 def process_align_markers(string: str) -> str:
@@ -220,19 +399,45 @@ def process_align_markers(string: str) -> str:
     Returns:
         The string with markers removed and aligned values indented appropriately.
     """
+    if _SEP not in string:
+        return string
+
+    start = string.find(_ALIGN_MARKER_START)
+    if start == -1:
+        return string
+
     result_parts: list[str] = []
+    indent = ""
+    in_indent = True
     last_end = 0
 
-    for match in _ALIGN_MARKER.finditer(string):
+    # Bound once to avoid repeated attribute lookups in the loop
+    find = string.find
+    append = result_parts.append
+
+    while start != -1:
+        if (bounds := _find_aligned_value(string, start)) is None:
+            # Not a well-formed marker, so keep scanning past it
+            start = find(_ALIGN_MARKER_START, start + 1)
+            continue
+
+        value_start, value_end = bounds
+        if value_end == -1:
+            # Nothing after this marker is closed, so no later marker can be well-formed either
+            break
+
         # Text before this marker
-        result_parts.append(string[last_end : match.start()])
-        # Preceding text is what we've built so far
-        preceding_text = "".join(result_parts)
-        value = match.group(2)
-        value = process_align_markers(value)  # Handle nested markers first
-        aligned_value = _align_value(value, preceding_text)
-        result_parts.append(aligned_value)
-        last_end = match.end()
+        text = string[last_end:start]
+        append(text)
+        indent, in_indent = _advance_indent(text, indent=indent, in_indent=in_indent)
+
+        value = process_align_markers(string[value_start:value_end])  # Handle nested markers first
+        aligned_value = _align_value(value, indent)
+        append(aligned_value)
+        indent, in_indent = _advance_indent(aligned_value, indent=indent, in_indent=in_indent)
+
+        last_end = value_end + len(_ALIGN_MARKER_END)
+        start = find(_ALIGN_MARKER_START, last_end)
 
     if last_end == 0:
         return string
@@ -243,26 +448,9 @@ def process_align_markers(string: str) -> str:
 
 if sys.version_info >= (3, 14):
     from string.templatelib import Interpolation, Template, convert
-    from typing import LiteralString, TypeVar
-
-    T = TypeVar(name="T")
-
-    def _partition(it: Iterable[T], pred: Callable[[T], bool]) -> tuple[filter[T], filterfalse[T]]:
-        """
-        Partition an iterable into two filters based on a predicate.
-
-        Args:
-            it: The iterable to partition.
-            pred: A function that returns True for items in the first partition.
-
-        Returns:
-            A tuple of (matching_filter, non_matching_filter) where matching_filter contains items
-            for which predicate returns True, and non_matching_filter contains items for which
-            predicate returns False.
-        """
-        it1, it2 = tee(it)
-        return filter(pred, it1), filterfalse(pred, it2)
+    from typing import LiteralString
 
+    @lru_cache(maxsize=256)
     def _parse_format_spec(format_spec: str) -> tuple[str, bool | None]:
         """
         Parse format spec to extract alignment-specific directives.
@@ -281,23 +469,26 @@ if sys.version_info >= (3, 14):
                 neither was present. If multiple alignment specs are present, the last one takes
                 precedence.
         """
-        specs = format_spec.split(":")
+        dedent_spec: str | None = None
+        other_specs: list[str] = []
 
-        pred = set(AlignSpec).__contains__
-        dedent_specs, other_specs = _partition(specs, pred)
-        *_, dedent_spec = list(dedent_specs) or [None]
+        for spec in format_spec.split(":"):
+            if spec in _ALIGN_SPECS:
+                dedent_spec = spec
+            else:
+                other_specs.append(spec)
 
         format_spec = ":".join(other_specs)
 
         if dedent_spec is None:
             return format_spec, None
 
-        return format_spec, AlignSpec(dedent_spec) == AlignSpec.ALIGN
+        return format_spec, dedent_spec == AlignSpec.ALIGN
 
     def _handle_item(
         item: str | Interpolation,
         *,
-        preceding_text: str,
+        indent: str,
         align: bool,
     ) -> str:
         """
@@ -308,7 +499,7 @@ if sys.version_info >= (3, 14):
 
         Args:
             item: Either a string literal or an Interpolation object.
-            preceding_text: The text that precedes this item, used for alignment.
+            indent: The leading whitespace of the line the item is placed on, used for alignment.
             align: Whether to align multiline values by default (can be overridden by format spec
                 directives).
 
@@ -318,27 +509,55 @@ if sys.version_info >= (3, 14):
         if isinstance(item, str):
             return item
 
-        value = convert(cast("object", item.value), item.conversion)
+        value = cast("object", item.value)
+        if item.conversion is not None:
+            value = convert(value, item.conversion)
+
+        format_spec = ""
         align_override: bool | None = None
 
         if item.format_spec:
             format_spec, align_override = _parse_format_spec(item.format_spec)
-            if format_spec:
-                value = format(value, format_spec)
 
-        value = str(value)
+        if format_spec:
+            value = format(value, format_spec)
+        elif type(value) is not str:  # Exact type check, since a str subclass may override __str__
+            value = str(value)
         should_align = align_override if align_override is not None else align
         if should_align:
-            value = _align_value(value, preceding_text)
+            value = _align_value(value, indent)
 
         return value
 
+    def _render_template(template: Template, *, align: bool) -> str:
+        """
+        Render a template into a string, processing each item in order.
+
+        Args:
+            template: The template to render.
+            align: Whether to align multiline values by default.
+
+        Returns:
+            The rendered string.
+        """
+        parts: list[str] = []
+        append = parts.append
+        indent = ""
+        in_indent = True
+
+        for item in template:
+            part = _handle_item(item, indent=indent, align=align)
+            append(part)
+            indent, in_indent = _advance_indent(part, indent=indent, in_indent=in_indent)
+
+        return "".join(parts)
+
     def dedent(  # pyright: ignore[reportUnreachable]
         string: Template | LiteralString,
         /,
         *,
-        align: bool | Missing = MISSING,
-        strip: Strip | Missing = MISSING,
+        align: bool | None = None,
+        strip: Strip | None = None,
     ) -> str:
         r'''
         Dedent, strip, and align a template string.
@@ -364,6 +583,7 @@ if sys.version_info >= (3, 14):
 
         Raises:
             TypeError: If the input is not a string or Template object.
+            ValueError: If `strip` is not a known strip mode.
 
         Returns:
             The dedented string with common leading whitespace removed, stripped according to
@@ -378,25 +598,28 @@ if sys.version_info >= (3, 14):
             >>> print(result)
             Hello, World!
         '''
-        align = align if not isinstance(align, Missing) else DEFAULT_ALIGN
-        strip = strip if not isinstance(strip, Missing) else DEFAULT_STRIP
+        align = DEFAULT_ALIGN if align is None else align
+        strip = DEFAULT_STRIP if strip is None else strip
+
+        if not isinstance(string, (str, Template)):  # pyright: ignore[reportUnnecessaryIsInstance]
+            message = f"expected str or Template, not {type(string).__qualname__!r}"
+            raise TypeError(message)  # pyright: ignore[reportUnreachable]
+
+        if strip not in _LINE_STRIPPERS:
+            message = f"expected strip to be one of {_STRIP_MODES}, not {strip!r}"
+            raise ValueError(message)
 
         match string:
-            case str() as formatted_string:
+            case str() as literal_string:
+                pass
+            case Template(strings=(literal_string,)):
+                # Without interpolations, a template is just its literal string
                 pass
             case Template() as template:
-                formatted_string = reduce(
-                    lambda acc, item: acc + _handle_item(item, preceding_text=acc, align=align),
-                    template,
-                    initial="",
-                )
-            case unknown if not TYPE_CHECKING:  # pyright: ignore[reportUnnecessaryComparison]
-                message = f"expected str or Template, not {type(unknown).__qualname__!r}"  # pyright: ignore[reportUnreachable]
-                raise TypeError(message)
-
-        formatted_string = process_align_markers(formatted_string)
-        formatted_string = _dedent_string(formatted_string)
-        return _strip_string(formatted_string, strip)
+                formatted_string = process_align_markers(_render_template(template, align=align))
+                return _dedent_and_strip(formatted_string, strip)
+
+        return _dedent_string(literal_string, strip)
 
 else:
 
@@ -404,7 +627,7 @@ else:
         string: str,
         /,
         *,
-        strip: Strip | Missing = MISSING,
+        strip: Strip | None = None,
     ) -> str:
         r'''
         Dedent and strip a string, with optional multiline-value alignment.
@@ -422,6 +645,7 @@ else:
 
         Raises:
             TypeError: If the input is not a string.
+            ValueError: If `strip` is not a known strip mode.
 
         Returns:
             The dedented string with common leading whitespace removed.
@@ -439,12 +663,14 @@ else:
                 - a
                 - b
         '''
-        strip = strip if not isinstance(strip, Missing) else DEFAULT_STRIP
+        strip = DEFAULT_STRIP if strip is None else strip
 
         if not isinstance(string, str):  # pyright: ignore[reportUnnecessaryIsInstance]
             message = f"expected str, not {type(string).__qualname__!r}"
             raise TypeError(message)  # pyright: ignore[reportUnreachable]
 
-        formatted_string = process_align_markers(string)
-        formatted_string = _dedent_string(formatted_string)
-        return _strip_string(formatted_string, strip)
+        if strip not in _LINE_STRIPPERS:
+            message = f"expected strip to be one of {_STRIP_MODES}, not {strip!r}"
+            raise ValueError(message)
+
+        return _dedent_string(string, strip)
@@ -8,23 +8,66 @@ Adapted from https://github.com/dmnd/dedent/blob/7b38d9/src/dedent.test.ts
 
 import sys
 from collections.abc import Callable
+from functools import cache
+from types import CodeType
 from typing import Final, cast
 
 import pytest
-from _pytest.fixtures import SubRequest
 from syrupy.assertion import SnapshotAssertion
 
 from dedent import align as align_values
 from dedent import dedent
-from dedent._dedent import _ALIGN_MARKER_PREFIX, _SEP, MISSING, AlignSpec, Missing, Strip
+from dedent._dedent import (
+    _ALIGN_MARKER_PREFIX,
+    _ALIGN_MARKER_START,
+    _CACHE_MAX_LENGTH,
+    _SEP,
+    AlignSpec,
+    Strip,
+    _dedent_cached,
+)
 
-StripOption = Strip | Missing
-AlignOption = bool | Missing
+StripOption = Strip | None
+AlignOption = bool | None
 
-STRIP_OPTIONS: Final[list[StripOption]] = [MISSING, "smart", "all", "none"]
-ALIGN_OPTIONS: Final[list[AlignOption]] = [MISSING, False, True]
+STRIP_OPTIONS: Final[tuple[StripOption, ...]] = (None, "smart", "all", "none")
+ALIGN_OPTIONS: Final[tuple[AlignOption, ...]] = (None, False, True)
+SPEC_OPTIONS: Final[tuple[str, ...]] = tuple(spec.value for spec in AlignSpec)
 
-required_py314 = pytest.mark.skipif(sys.version_info < (3, 14), reason="requires Python 3.14+")
+_ITEMS: Final = "- apples\n- bananas\n- cherries"
+
+# Dashes stand in for spaces that editors would otherwise strip
+_TRAILING_WHITESPACE: Final = """
+    foo---
+    bar---
+    """.replace("-", " ")
+_SPECIAL_WHITESPACE: Final = """---
+
+    foo
+    bar
+
+    ---""".replace("-", " ")
+_INVERSE_SPECIAL_WHITESPACE: Final = """
+    ---
+    foo
+    bar
+    ---
+    """.replace("-", " ")
+
+
+def _identity(value: object) -> object:
+    return value
+
+
+_ALIGN_TO_FN: Final[dict[AlignOption, Callable[..., object]]] = {
+    None: _identity,
+    False: _identity,
+    True: align_values,
+}
+
+_PY314: Final = sys.version_info >= (3, 14)
+
+required_py314 = pytest.mark.skipif(not _PY314, reason="requires Python 3.14+")
 
 if sys.version_info >= (3, 14):
     from string.templatelib import Template
@@ -34,9 +77,13 @@ else:
     _T = str
 
 
+@cache
+def _compile_t(source: str, /) -> CodeType:
+    return compile(f"t'''{source}'''", "<t-string>", "eval")
+
+
 def t(source: str, /, **ns: object) -> _T:
-    code = compile(f"t'''{source}'''", "<t-string>", "eval")
-    return cast("_T", eval(code, ns))  # noqa: S307
+    return cast("_T", eval(_compile_t(source), ns))  # noqa: S307
 
 
 class TestDedent:
@@ -199,13 +246,7 @@ class TestDedent:
 class TestStrip:
     @staticmethod
     def test_with_trailing_whitespace(snapshot: SnapshotAssertion, strip: StripOption) -> None:
-        assert snapshot == dedent(
-            """
-            foo---
-            bar---
-            """.replace("-", " "),
-            strip=strip,
-        )
+        assert snapshot == dedent(_TRAILING_WHITESPACE, strip=strip)
 
     @staticmethod
     def test_without_trailing_whitespace(snapshot: SnapshotAssertion, strip: StripOption) -> None:
@@ -225,63 +266,27 @@ class TestStrip:
 
             foo
             bar
-            """.replace("-", " "),
+            """,
             strip=strip,
         )
 
     @staticmethod
     def test_with_special_whitespace(snapshot: SnapshotAssertion, strip: StripOption) -> None:
-        assert snapshot == dedent(
-            """---
-
-            foo
-            bar
-
-            ---""".replace("-", " "),
-            strip=strip,
-        )
+        assert snapshot == dedent(_SPECIAL_WHITESPACE, strip=strip)
 
     @staticmethod
     def test_with_inverse_special_whitespace(
         snapshot: SnapshotAssertion, strip: StripOption
     ) -> None:
-        assert snapshot == dedent(
-            """
-            ---
-            foo
-            bar
-            ---
-            """.replace("-", " "),
-            strip=strip,
-        )
+        assert snapshot == dedent(_INVERSE_SPECIAL_WHITESPACE, strip=strip)
 
 
 class TestAlign:  # noqa: PLR0904
-    @pytest.fixture(scope="class", params=ALIGN_OPTIONS)
-    @staticmethod
-    def align(request: SubRequest) -> AlignOption:
-        return request.param  # pyright: ignore[reportAny]: bad pytest typing
-
-    @pytest.fixture(scope="class", params=[align.value for align in AlignSpec])
-    @staticmethod
-    def spec(request: SubRequest) -> str:
-        return request.param  # pyright: ignore[reportAny]: bad pytest typing
-
-    @staticmethod
-    def align_to_fn(align: AlignOption) -> Callable[..., object]:
-        def identity(value: object) -> object:
-            return value
-
-        return align_values if isinstance(align, bool) and align else identity
-
     @required_py314
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
     @staticmethod
     def test_with_multiple_lines(snapshot: SnapshotAssertion, align: AlignOption) -> None:
-        items = dedent("""
-            - apples
-            - bananas
-            - cherries
-        """)
+        items = _ITEMS
 
         assert snapshot == dedent(
             t("""
@@ -292,16 +297,12 @@ class TestAlign:  # noqa: PLR0904
             align=align,  # pyright: ignore[reportCallIssue]: matrix type checking
         )  # fmt: skip
 
-    def test_with_multiple_lines_legacy(
-        self, snapshot: SnapshotAssertion, align: AlignOption
-    ) -> None:
-        align_fn = self.align_to_fn(align)
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
+    @staticmethod
+    def test_with_multiple_lines_legacy(snapshot: SnapshotAssertion, align: AlignOption) -> None:
+        align_fn = _ALIGN_TO_FN[align]
 
-        items = dedent("""
-            - apples
-            - bananas
-            - cherries
-        """)
+        items = _ITEMS
 
         assert snapshot == dedent(
             f"""
@@ -312,6 +313,7 @@ class TestAlign:  # noqa: PLR0904
         )
 
     @required_py314
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
     @staticmethod
     def test_with_single_line(snapshot: SnapshotAssertion, align: AlignOption) -> None:
         assert snapshot == dedent(
@@ -323,8 +325,10 @@ class TestAlign:  # noqa: PLR0904
             align=align,  # pyright: ignore[reportCallIssue]: matrix type checking
         )  # fmt: skip
 
-    def test_with_single_line_legacy(self, snapshot: SnapshotAssertion, align: AlignOption) -> None:
-        align_fn = self.align_to_fn(align)
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
+    @staticmethod
+    def test_with_single_line_legacy(snapshot: SnapshotAssertion, align: AlignOption) -> None:
+        align_fn = _ALIGN_TO_FN[align]
 
         assert snapshot == dedent(
             f"""
@@ -335,33 +339,26 @@ class TestAlign:  # noqa: PLR0904
         )
 
     @required_py314
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
     @staticmethod
     def test_no_indentation(snapshot: SnapshotAssertion, align: AlignOption) -> None:
-        items = dedent("""
-            - apples
-            - bananas
-            - cherries
-        """)
+        items = _ITEMS
         assert snapshot == dedent(t("{items}", items=items), align=align)  # pyright: ignore[reportCallIssue]: matrix type checking
 
-    def test_no_indentation_legacy(self, snapshot: SnapshotAssertion, align: AlignOption) -> None:
-        align_fn = self.align_to_fn(align)
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
+    @staticmethod
+    def test_no_indentation_legacy(snapshot: SnapshotAssertion, align: AlignOption) -> None:
+        align_fn = _ALIGN_TO_FN[align]
 
-        items = dedent("""
-            - apples
-            - bananas
-            - cherries
-        """)
+        items = _ITEMS
         assert snapshot == dedent(f"{align_fn(items)}")  # pyright: ignore[reportArgumentType]: matrix type checking
 
     @required_py314
+    @pytest.mark.parametrize("spec", SPEC_OPTIONS)
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
     @staticmethod
     def test_override(snapshot: SnapshotAssertion, align: AlignOption, spec: str) -> None:
-        items = dedent("""
-            - apples
-            - bananas
-            - cherries
-        """)
+        items = _ITEMS
         assert snapshot == dedent(
             t("""
             List:
@@ -372,18 +369,16 @@ class TestAlign:  # noqa: PLR0904
         )  # fmt: skip
 
     @required_py314
+    @pytest.mark.parametrize("spec", SPEC_OPTIONS)
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
     @staticmethod
     def test_override_with_format_spec(
         snapshot: SnapshotAssertion, align: AlignOption, spec: str
     ) -> None:
-        if isinstance(align, Missing):
+        if align is None:
             return
 
-        items = dedent("""
-            - apples
-            - bananas
-            - cherries
-        """)
+        items = _ITEMS
         size = len(items) + 2
 
         assert snapshot == dedent(
@@ -403,16 +398,20 @@ class TestAlign:  # noqa: PLR0904
             _ = dedent(t("{123:algn}"))  # misspelled "align"
 
     @required_py314
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
     @staticmethod
     def test_empty_string(snapshot: SnapshotAssertion, align: AlignOption) -> None:
         assert snapshot == dedent("", align=align)  # pyright: ignore[reportArgumentType,reportCallIssue]: matrix type checking
 
-    def test_empty_string_legacy(self, snapshot: SnapshotAssertion, align: AlignOption) -> None:
-        align_fn = self.align_to_fn(align)
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
+    @staticmethod
+    def test_empty_string_legacy(snapshot: SnapshotAssertion, align: AlignOption) -> None:
+        align_fn = _ALIGN_TO_FN[align]
 
         assert snapshot == dedent(f"{align_fn('')}")  # pyright: ignore[reportArgumentType]: matrix type checking
 
     @required_py314
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
     @staticmethod
     def test_two_aligned_values(snapshot: SnapshotAssertion, align: AlignOption) -> None:
         a = "line1\nline2"
@@ -427,10 +426,10 @@ class TestAlign:  # noqa: PLR0904
             align=align,  # pyright: ignore[reportCallIssue]: matrix type checking
         )  # fmt: skip
 
-    def test_two_aligned_values_legacy(
-        self, snapshot: SnapshotAssertion, align: AlignOption
-    ) -> None:
-        align_fn = self.align_to_fn(align)
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
+    @staticmethod
+    def test_two_aligned_values_legacy(snapshot: SnapshotAssertion, align: AlignOption) -> None:
+        align_fn = _ALIGN_TO_FN[align]
         a = "line1\nline2"
         b = "foo\nbar"
         assert snapshot == dedent(f"""
@@ -441,6 +440,7 @@ class TestAlign:  # noqa: PLR0904
         """)  # pyright: ignore[reportArgumentType]: matrix type checking
 
     @required_py314
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
     @staticmethod
     def test_aligned_and_plain(snapshot: SnapshotAssertion, align: AlignOption) -> None:
         items = "- apples\n- bananas"
@@ -455,10 +455,10 @@ class TestAlign:  # noqa: PLR0904
             align=align,  # pyright: ignore[reportCallIssue]: matrix type checking
         )  # fmt: skip
 
-    def test_aligned_and_plain_legacy(
-        self, snapshot: SnapshotAssertion, align: AlignOption
-    ) -> None:
-        align_fn = self.align_to_fn(align)
+    @pytest.mark.parametrize("align", ALIGN_OPTIONS)
+    @staticmethod
+    def test_aligned_and_plain_legacy(snapshot: SnapshotAssertion, align: AlignOption) -> None:
+        align_fn = _ALIGN_TO_FN[align]
         items = "- apples\n- bananas"
         plain = "hello"
         assert snapshot == dedent(f"""
@@ -591,6 +591,63 @@ class TestAlign:  # noqa: PLR0904
         assert "line1" in result
         assert "line2" in result
 
+    @staticmethod
+    def test_aligned_value_edited_after_marking() -> None:
+        value = "a\r\nb"
+        string = f"""
+            x:
+                {align_values(value)}
+            tail
+        """.replace("\r\n", "\n")
+        result = dedent(string)  # pyright: ignore[reportArgumentType]: matrix type checking
+        assert result == "x:\n    a\n    b\ntail"
+
+    @staticmethod
+    def test_aligned_value_edited_past_end() -> None:
+        value = "a\r\nb"
+        result = dedent("  x " + str(align_values(value)).replace("\r\n", "\n"))  # pyright: ignore[reportArgumentType]: matrix type checking
+        assert result == "x a\nb"
+
+    @staticmethod
+    def test_nested_aligned_values_edited_after_marking() -> None:
+        value = "p\r\nq"
+        inner = f"inner:\n    {align_values(value)}"
+        string = f"""
+            outer:
+                {align_values(inner)}
+            tail
+        """.replace("\r\n", "\n")
+        result = dedent(string)  # pyright: ignore[reportArgumentType]: matrix type checking
+        assert result == "outer:\n    inner:\n        p\n        q\ntail"
+
+    @staticmethod
+    def test_malformed_marker_length() -> None:
+        malformed = f"{_ALIGN_MARKER_START}zz{_SEP}"
+        value = "a\nb"
+        result = dedent(f"  {malformed}\n  x {align_values(value)}")  # pyright: ignore[reportArgumentType]: matrix type checking
+        assert result == f"{malformed}\nx a\nb"
+
+    @staticmethod
+    def test_unterminated_marker_length() -> None:
+        string = f"x {_ALIGN_MARKER_START}4"
+        assert dedent(string) == string  # pyright: ignore[reportArgumentType]: matrix type checking
+
+    @staticmethod
+    def test_unclosed_marker() -> None:
+        string = f"{_ALIGN_MARKER_START}4{_SEP}a\nb"
+        assert dedent(string) == string  # pyright: ignore[reportArgumentType]: matrix type checking
+
+    @staticmethod
+    def test_unclosed_markers_after_aligned_value() -> None:
+        value = "a\nb"
+        unclosed = f"{_ALIGN_MARKER_START}4{_SEP}c" * 3
+        result = dedent(f"  x {align_values(value)}\n  {unclosed}")  # pyright: ignore[reportArgumentType]: matrix type checking
+        assert result == f"x a\nb\n{unclosed}"
+
+    @staticmethod
+    def test_stray_null_byte() -> None:
+        assert dedent(f"  a{_SEP}b\n  c") == f"a{_SEP}b\nc"  # pyright: ignore[reportArgumentType]: matrix type checking
+
     @staticmethod
     def test_aligned_str_contains_markers() -> None:
         hello = "hello"
@@ -664,6 +721,18 @@ class TestTyping:
         with pytest.raises(TypeError):
             _ = dedent(123)  # pyright: ignore[reportArgumentType]: allow unsupported type for this test
 
+        with pytest.raises(TypeError):
+            _ = dedent(123, strip="bogus")  # pyright: ignore[reportArgumentType]: allow unsupported type for this test
+
+    @pytest.mark.parametrize("string", ["  single line  ", "  first\n  second"])
+    @staticmethod
+    def test_unsupported_strip(string: str) -> None:
+        """
+        Test that unknown strip modes are rejected, whatever the shape of the input.
+        """
+        with pytest.raises(ValueError, match=r"one of 'smart', 'all', 'none', not 'bogus'"):
+            _ = dedent(string, strip="bogus")  # pyright: ignore[reportArgumentType]: allow unsupported strip mode for this test
+
 
 class TestSingleLine:
     @staticmethod
@@ -701,3 +770,15 @@ class TestUnicodeCharacterPreservation:
     @staticmethod
     def test_preserves_ideographs(snapshot: SnapshotAssertion) -> None:
         assert snapshot == dedent("弟気")
+
+
+class TestCache:
+    @staticmethod
+    def test_caches_only_short_strings() -> None:
+        _dedent_cached.cache_clear()
+        short = "  first\n  second"
+        long = short + "\n  third" * _CACHE_MAX_LENGTH
+
+        assert dedent(short) == "first\nsecond"
+        assert dedent(long).startswith("first\nsecond\nthird")
+        assert _dedent_cached.cache_info().currsize == 1